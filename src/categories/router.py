@@ -1,7 +1,7 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -14,6 +14,8 @@ from src.categories.schemas import (
     CategoryWithTranslations,
 )
 from src.database import get_db
+from src.words.models import Word, WordTranslation
+from src.words.router import invalidate_word_cache
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -27,7 +29,6 @@ async def create_category(
     db_category = Category(key=category.key)
     db.add(db_category)
     await db.commit()
-    await db.refresh(db_category)
     return db_category
 
 
@@ -88,8 +89,17 @@ async def delete_category(
             detail=f"Category with id {category_id} not found"
         )
     
+    # Its words go with it, so their cached responses must go too
+    result = await db.execute(select(Word.id).where(Word.category_id == category_id))
+    word_ids = result.scalars().all()
+    
+    # Word.translations is left to ON DELETE CASCADE (passive_deletes), which
+    # tables created before it was added don't have, so delete them here
+    if word_ids:
+        await db.execute(delete(WordTranslation).where(WordTranslation.word_id.in_(word_ids)))
     await db.delete(category)
     await db.commit()
+    await invalidate_word_cache(*word_ids)
 
 
 # ========== Category Translations Endpoints ==========
@@ -125,7 +135,6 @@ async def create_category_translation(
     )
     db.add(db_translation)
     await db.commit()
-    await db.refresh(db_translation)
     return db_translation
 
 
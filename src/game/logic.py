@@ -236,58 +236,40 @@ async def transition_to_playing(room: Room) -> Room:
     return room
 
 
-async def request_voting(room: Room, player_id: str) -> Tuple[Room, bool]:
+async def request_voting(room_id: str, player_id: str) -> Tuple[Optional[Room], bool]:
     """
     Player requests to start voting phase.
-    Returns (updated_room, should_start_voting).
-    Voting starts if more than half the players want to vote.
+    Returns (updated_room, should_start_voting), with room None if it doesn't exist.
+    Voting starts if more than half the players want to vote. The request
+    and the majority check run atomically in Redis.
     """
-    if room.phase != RoomPhase.PLAYING:
-        return room, False
-    
-    if player_id not in room.players:
-        return room, False
-    
-    # Mark player as wanting to vote
-    room.players[player_id].wants_to_vote = True
+    result = await RoomManager.request_vote(room_id, player_id, time.time())
+    if result is None:
+        return None, False
     
-    # Check if majority wants to vote
-    total_players = len(room.players)
-    wants_to_vote_count = sum(1 for p in room.players.values() if p.wants_to_vote)
-    majority_threshold = (total_players // 2) + 1
-    
-    should_start_voting = wants_to_vote_count >= majority_threshold
+    status, room = result
+    should_start_voting = status == 2
     
     if should_start_voting:
-        room.phase = RoomPhase.VOTING
-        room.game_state.phase_start_time = time.time()
         logger.info(f"🗳️ Room {room.id} transitioned to VOTING phase (majority requested)")
     
-    await RoomManager.update_room(room)
-    
     return room, should_start_voting
 
 
-async def submit_vote(room: Room, voter_id: str, voted_for_id: str) -> Tuple[Room, bool]:
+async def submit_vote(room_id: str, voter_id: str, voted_for_id: str) -> Tuple[Optional[Room], bool]:
     """
     Submit a vote.
-    Returns (updated_room, all_voted).
+    Returns (updated_room, all_voted), with room None if it doesn't exist.
+    Votes for oneself or outside the voting phase are ignored.
     """
-    if room.phase != RoomPhase.VOTING:
-        return room, False
+    result = await RoomManager.submit_vote(room_id, voter_id, voted_for_id)
+    if result is None:
+        return None, False
     
-    if voter_id not in room.players or voted_for_id not in room.players:
+    recorded, room = result
+    if not recorded:
         return room, False
     
-    if voter_id == voted_for_id:
-        return room, False  # Can't vote for yourself
-    
-    # Record vote
-    room.players[voter_id].vote = voted_for_id
-    room.game_state.votes_submitted = sum(1 for p in room.players.values() if p.vote is not None)
-    
-    await RoomManager.update_room(room)
-    
     # Check if everyone has voted
     all_voted = room.game_state.votes_submitted >= len(room.players)
     
@@ -3,6 +3,7 @@ import asyncio
 import os
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.auth.router import router as auth_router
@@ -13,6 +14,7 @@ from src.words.router import router as words_router
 from src.rooms.router import router as rooms_router
 from src.redis.client import redis_client
 from src.sockets.redis_listener import redis_listener
+from src.sockets.redis_publisher import redis_publisher
 from src.logging_config import setup_logging, get_logger
 from src.seed import seed_if_empty, seed_database
 
@@ -35,6 +37,9 @@ async def lifespan(app: FastAPI):
     # Start Redis Pub/Sub listener in background
     asyncio.create_task(redis_listener())
     
+    # Start batched Redis publisher in background
+    asyncio.create_task(redis_publisher())
+    
     yield
     
     # Cleanup on shutdown
@@ -46,6 +51,8 @@ app = FastAPI(
     description="API for managing categories and words",
     version="1.0.0",
     lifespan=lifespan,
+    # Encode JSON responses with orjson (already a dependency) instead of json
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS - Only allow specific origins
@@ -56,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],  # Words pagination cursor
 )
 
 # Include routers
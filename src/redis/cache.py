@@ -0,0 +1,37 @@
+"""Redis read-through cache for database-backed HTTP reads."""
+import os
+from typing import Optional, Union
+
+from src.redis.client import redis_client
+from src.logging_config import get_logger
+
+
+logger = get_logger(__name__)
+
+# How long cached responses live (seconds); writes invalidate them sooner
+CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+
+
+async def cache_get(key: str) -> Optional[str]:
+    """Get a cached value, or None on a miss or if Redis is unavailable."""
+    try:
+        return await redis_client.client.get(key)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache read failed for {key}: {e}")
+        return None
+
+
+async def cache_set(key: str, value: Union[str, bytes], ex: int = CACHE_TTL):
+    """Cache a value; failures are logged and ignored."""
+    try:
+        await redis_client.client.set(key, value, ex=ex)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache write failed for {key}: {e}")
+
+
+async def cache_delete(*keys: str):
+    """Invalidate cached values; failures are logged and ignored."""
+    try:
+        await redis_client.client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache invalidation failed for {keys}: {e}")
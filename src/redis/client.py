@@ -19,18 +19,26 @@ class RedisClient:
         """Initialize Redis connection."""
         if self._redis is None:
             redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-            self._redis = await redis.from_url(
+            # Sized for concurrent socket handlers, so independent coroutines
+            # get their own connection instead of queuing behind one. When
+            # it's exhausted, callers wait for a free connection (up to the
+            # timeout) instead of failing with "Too many connections".
+            pool = redis.BlockingConnectionPool.from_url(
                 redis_url,
                 encoding="utf-8",
                 decode_responses=True,
-                max_connections=10
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "64")),
+                timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+                health_check_interval=30,
+                socket_keepalive=True
             )
+            self._redis = redis.Redis(connection_pool=pool)
             print(f"✅ Connected to Redis: {redis_url}")
     
     async def disconnect(self):
         """Close Redis connection."""
         if self._redis:
-            await self._redis.aclose()
+            await self._redis.aclose(close_connection_pool=True)
             self._redis = None
             print("❌ Disconnected from Redis")
     
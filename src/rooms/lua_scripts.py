@@ -0,0 +1,289 @@
+"""Lua scripts used by RoomManager for atomic, single round-trip room updates."""
+
+# Shared helper: count the ready players in a players hash. Rooms saved
+# before ready_count existed don't have the field, so scripts set it from
+# this count instead of incrementing from a missing (zero) base.
+_COUNT_READY = """
+local function count_ready(players_key)
+    local ready = 0
+    for _, player_json in ipairs(redis.call('HVALS', players_key)) do
+        if cjson.decode(player_json)['is_ready'] then
+            ready = ready + 1
+        end
+    end
+    return ready
+end
+"""
+
+# Remove a player and return the metadata the leave flow needs.
+#
+# KEYS: room hash, players hash, usernames hash, public rooms sorted set
+# ARGV: player_id, room_id, ttl
+#
+# Returns nil if the room or the player doesn't exist. Otherwise returns
+# {host_id, player_count_before} when the room was deleted (last player or
+# host left), or {host_id, player_count_before, room_hash, players_hash}
+# (hashes as flat HGETALL arrays) when the room still exists.
+REMOVE_PLAYER = _COUNT_READY + """
+local host_id = redis.call('HGET', KEYS[1], 'host_id')
+if not host_id then
+    return nil
+end
+
+local player_json = redis.call('HGET', KEYS[2], ARGV[1])
+if not player_json then
+    return nil
+end
+
+local count_before = redis.call('HLEN', KEYS[2])
+local player = cjson.decode(player_json)
+local username = player['username']
+
+redis.call('HDEL', KEYS[2], ARGV[1])
+if redis.call('HGET', KEYS[3], username) == ARGV[1] then
+    redis.call('HDEL', KEYS[3], username)
+end
+
+if count_before <= 1 or ARGV[1] == host_id then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+    redis.call('ZREM', KEYS[4], ARGV[2])
+    return {host_id, count_before}
+end
+
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+if redis.call('HEXISTS', KEYS[1], 'ready_count') == 0 then
+    redis.call('HSET', KEYS[1], 'ready_count', count_ready(KEYS[2]))
+elseif player['is_ready'] then
+    redis.call('HINCRBY', KEYS[1], 'ready_count', -1)
+end
+
+local ttl = tonumber(ARGV[3])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+-- Only public rooms are in the set; XX keeps private rooms out of it
+redis.call('ZADD', KEYS[4], 'XX', count_before - 1, ARGV[2])
+
+return {host_id, count_before, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# Flip a player's ready status.
+#
+# KEYS: room hash, players hash, usernames hash
+# ARGV: player_id, ttl
+#
+# Returns nil if the room or the player doesn't exist, otherwise
+# {room_hash, players_hash}.
+TOGGLE_READY = _COUNT_READY + """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+
+local player_json = redis.call('HGET', KEYS[2], ARGV[1])
+if not player_json then
+    return nil
+end
+
+local player = cjson.decode(player_json)
+player['is_ready'] = not player['is_ready']
+redis.call('HSET', KEYS[2], ARGV[1], cjson.encode(player))
+if redis.call('HEXISTS', KEYS[1], 'ready_count') == 0 then
+    redis.call('HSET', KEYS[1], 'ready_count', count_ready(KEYS[2]))
+else
+    redis.call('HINCRBY', KEYS[1], 'ready_count', player['is_ready'] and 1 or -1)
+end
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+
+local ttl = tonumber(ARGV[2])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+return {redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# Rename a player and move their entry in the username index.
+#
+# KEYS: room hash, players hash, usernames hash
+# ARGV: player_id, new username, ttl
+#
+# Returns nil if the room or the player doesn't exist, otherwise
+# {room_hash, players_hash}.
+RENAME_PLAYER = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+
+local player_json = redis.call('HGET', KEYS[2], ARGV[1])
+if not player_json then
+    return nil
+end
+
+local player = cjson.decode(player_json)
+if redis.call('HGET', KEYS[3], player['username']) == ARGV[1] then
+    redis.call('HDEL', KEYS[3], player['username'])
+end
+player['username'] = ARGV[2]
+redis.call('HSET', KEYS[2], ARGV[1], cjson.encode(player))
+redis.call('HSET', KEYS[3], ARGV[2], ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+
+local ttl = tonumber(ARGV[3])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+return {redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# Record that a player wants to vote, and start the voting phase once a
+# majority of the players want to.
+#
+# KEYS: room hash, players hash, usernames hash
+# ARGV: player_id, now, ttl
+#
+# Returns nil if the room doesn't exist, otherwise
+# {status, room_hash, players_hash} where status is 0 if nothing changed
+# (not in the playing phase or unknown player), 1 if the request was
+# recorded and 2 if it also started the voting phase.
+REQUEST_VOTE = """
+local phase = redis.call('HGET', KEYS[1], 'phase')
+if not phase then
+    return nil
+end
+
+local player_json = redis.call('HGET', KEYS[2], ARGV[1])
+if phase ~= 'playing' or not player_json then
+    return {0, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+end
+
+local player = cjson.decode(player_json)
+player['wants_to_vote'] = true
+redis.call('HSET', KEYS[2], ARGV[1], cjson.encode(player))
+
+local total, wants_to_vote = 0, 0
+for _, other_json in ipairs(redis.call('HVALS', KEYS[2])) do
+    total = total + 1
+    if cjson.decode(other_json)['wants_to_vote'] then
+        wants_to_vote = wants_to_vote + 1
+    end
+end
+
+local status = 1
+if wants_to_vote >= math.floor(total / 2) + 1 then
+    status = 2
+    redis.call('HSET', KEYS[1], 'phase', 'voting')
+    local game_state_json = redis.call('HGET', KEYS[1], 'game_state')
+    if game_state_json and game_state_json ~= '' then
+        local game_state = cjson.decode(game_state_json)
+        game_state['phase_start_time'] = tonumber(ARGV[2])
+        redis.call('HSET', KEYS[1], 'game_state', cjson.encode(game_state))
+    end
+end
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+
+local ttl = tonumber(ARGV[3])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+return {status, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# Record a player's vote and update the submitted vote count.
+#
+# KEYS: room hash, players hash, usernames hash
+# ARGV: voter_id, voted_for_id, ttl
+#
+# Returns nil if the room doesn't exist, otherwise
+# {status, room_hash, players_hash} where status is 0 if nothing changed
+# (not in the voting phase, unknown player or a vote for oneself) and 1 if
+# the vote was recorded.
+SUBMIT_VOTE = """
+local phase = redis.call('HGET', KEYS[1], 'phase')
+if not phase then
+    return nil
+end
+
+local voter_json = redis.call('HGET', KEYS[2], ARGV[1])
+if phase ~= 'voting' or not voter_json or ARGV[1] == ARGV[2]
+        or redis.call('HEXISTS', KEYS[2], ARGV[2]) == 0 then
+    return {0, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+end
+
+local voter = cjson.decode(voter_json)
+voter['vote'] = ARGV[2]
+redis.call('HSET', KEYS[2], ARGV[1], cjson.encode(voter))
+
+local votes_submitted = 0
+for _, player_json in ipairs(redis.call('HVALS', KEYS[2])) do
+    if cjson.decode(player_json)['vote'] ~= cjson.null then
+        votes_submitted = votes_submitted + 1
+    end
+end
+
+local game_state_json = redis.call('HGET', KEYS[1], 'game_state')
+if game_state_json and game_state_json ~= '' then
+    local game_state = cjson.decode(game_state_json)
+    game_state['votes_submitted'] = votes_submitted
+    redis.call('HSET', KEYS[1], 'game_state', cjson.encode(game_state))
+end
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+
+local ttl = tonumber(ARGV[3])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+return {1, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# Join a room: reconnect the player registered with the username, or check
+# the password and capacity and add a new player.
+#
+# KEYS: room hash, players hash, usernames hash, public rooms sorted set
+# ARGV: room_id, username, password, new player_id, new player JSON, ttl
+#
+# Returns nil if the room doesn't exist, {'bad_password'} or {'full'} if
+# the new player can't join, {'id_taken'} if another player already has the
+# new player_id, otherwise {'reconnected' or 'joined', player_id, room_hash,
+# players_hash}.
+JOIN_ROOM = """
+local settings_json = redis.call('HGET', KEYS[1], 'settings')
+if not settings_json then
+    return nil
+end
+
+local existing_id = redis.call('HGET', KEYS[3], ARGV[2])
+if existing_id and redis.call('HEXISTS', KEYS[2], existing_id) == 1 then
+    return {'reconnected', existing_id, redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+end
+
+local settings = cjson.decode(settings_json)
+local password = settings['password']
+if password ~= cjson.null and password ~= '' and password ~= ARGV[3] then
+    return {'bad_password'}
+end
+
+local player_count = redis.call('HLEN', KEYS[2])
+if player_count >= tonumber(settings['max_players']) then
+    return {'full'}
+end
+
+if redis.call('HEXISTS', KEYS[2], ARGV[4]) == 1 then
+    return {'id_taken'}
+end
+
+redis.call('HSET', KEYS[2], ARGV[4], ARGV[5])
+redis.call('HSET', KEYS[3], ARGV[2], ARGV[4])
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+
+local ttl = tonumber(ARGV[6])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('EXPIRE', KEYS[3], ttl)
+-- Only public rooms are in the set; XX keeps private rooms out of it
+redis.call('ZADD', KEYS[4], 'XX', player_count + 1, ARGV[1])
+
+return {'joined', ARGV[4], redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
@@ -1,7 +1,9 @@
 """Room and player models for multiplayer game."""
 from enum import Enum
 from typing import Optional, List, Dict
-from pydantic import BaseModel, Field, validator
+
+import orjson
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
 
 class RoomPhase(str, Enum):
@@ -38,13 +40,6 @@ class Player(BaseModel):
     vote: Optional[str] = None  # player_id they voted for
     is_host: bool = False
     wants_to_vote: bool = False  # Player requested voting phase
-    
-    def dict(self, *args, **kwargs):
-        """Convert to dict with enum values."""
-        d = super().dict(*args, **kwargs)
-        if self.role:
-            d['role'] = self.role.value
-        return d
 
 
 class RoomSettings(BaseModel):
@@ -84,20 +79,27 @@ class Room(BaseModel):
     game_state: Optional[GameState] = None
     round_number: int = 0
     created_at: float
+    version: int = 0  # Bumped on every save, lets clients detect missed deltas
     # Cache to avoid repetition between games
     last_word: Optional[str] = None  # Last word used (to avoid repetition)
     last_starting_player_id: Optional[str] = None  # Last player who started (to avoid repetition)
     
-    def dict(self, *args, **kwargs):
-        """Convert to dict with enum values."""
-        d = super().dict(*args, **kwargs)
-        d['phase'] = self.phase.value
-        d['players'] = {k: v.dict() for k, v in self.players.items()}
-        if self.game_state:
-            d['game_state'] = self.game_state.dict()
-            if self.game_state.result:
-                d['game_state']['result'] = self.game_state.result.value
-        return d
+    # Serialized JSON of the room, reused until the room is mutated and saved
+    _cached_json: Optional[bytes] = PrivateAttr(default=None)
+    
+    def to_json_bytes(self) -> bytes:
+        """Get the JSON encoding of the room, cached until invalidate_json()."""
+        if self._cached_json is None:
+            self._cached_json = orjson.dumps(self.model_dump(mode='json'))
+        return self._cached_json
+    
+    def json_fragment(self) -> orjson.Fragment:
+        """Get the cached JSON as a fragment that can be emitted without re-encoding."""
+        return orjson.Fragment(self.to_json_bytes())
+    
+    def invalidate_json(self):
+        """Drop the cached JSON after the room was mutated."""
+        self._cached_json = None
 
 
 # Request/Response models
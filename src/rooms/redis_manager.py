@@ -1,25 +1,73 @@
 """Redis-based room state management."""
-import json
+import base64
 import secrets
+import struct
 import time
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, NamedTuple, Tuple
+
+import orjson
+from redis.commands.core import AsyncScript
 from src.redis.client import redis_client
+from src.rooms import lua_scripts
 from src.rooms.models import Room, Player, RoomSettings, RoomPhase, GameState, GameResult
 
 
+class RoomCounts(NamedTuple):
+    """Host and player counts of a room, read without loading its players."""
+    host_id: str
+    player_count: int
+    ready_count: int
+
+
+class JoinResult(NamedTuple):
+    """Outcome of RoomManager.join_room."""
+    status: str  # 'joined', 'reconnected', 'bad_password' or 'full'
+    player_id: Optional[str] = None
+    room: Optional[Room] = None
+
+
 class RoomManager:
     """Manages room state in Redis using HASH and SET data structures."""
     
     ROOM_PREFIX = "room:"
     ROOM_PLAYERS_PREFIX = "room:players:"
+    ROOM_USERNAMES_PREFIX = "room:usernames:"
     PUBLIC_ROOMS_SET = "rooms:public"
     ROOM_TTL = 86400  # 24 hours
     
+    # Registered Lua scripts: source -> script bound to the current client
+    _scripts: Dict[str, AsyncScript] = {}
+    
+    @staticmethod
+    def _script(source: str) -> AsyncScript:
+        """Get a registered Lua script (runs via EVALSHA, falls back to EVAL)."""
+        redis = redis_client.client
+        script = RoomManager._scripts.get(source)
+        if script is None or script.registered_client is not redis:
+            script = redis.register_script(source)
+            RoomManager._scripts[source] = script
+        return script
+    
     @staticmethod
     def _generate_room_id() -> str:
         """Generate a unique room ID."""
         return secrets.token_urlsafe(8)
     
+    # Random per-process prefix: the monotonic clock is only unique within
+    # one process, while rooms are shared across instances and restarts
+    _PLAYER_ID_PREFIX = secrets.token_urlsafe(6)
+    
+    @staticmethod
+    def generate_player_id() -> str:
+        """
+        Generate a player ID.
+        Player IDs only need to be unique, not unguessable, so this encodes
+        the monotonic clock (behind a per-process prefix) instead of drawing
+        from the CSPRNG for each one.
+        """
+        clock = base64.urlsafe_b64encode(struct.pack('<Q', time.monotonic_ns())).rstrip(b'=').decode()
+        return f"{RoomManager._PLAYER_ID_PREFIX}{clock}"
+    
     @staticmethod
     async def create_room(settings: RoomSettings, host_player: Player) -> Room:
         """Create a new room with the host player."""
@@ -70,9 +118,14 @@ class RoomManager:
         players_key = f"{RoomManager.ROOM_PLAYERS_PREFIX}{actual_room_id}"
         players_data = await redis.hgetall(players_key)
         
+        return RoomManager._parse_room(room_data, players_data)
+    
+    @staticmethod
+    def _parse_room(room_data: Dict[str, str], players_data: Dict[str, str]) -> Room:
+        """Build a Room from its Redis room and players hashes."""
         # Parse room
         players = {
-            player_id: Player(**json.loads(player_json))
+            player_id: Player(**orjson.loads(player_json))
             for player_id, player_json in players_data.items()
         }
         
@@ -80,51 +133,73 @@ class RoomManager:
         game_state = None
         game_state_json = room_data.get("game_state")
         if game_state_json:
-            game_state = GameState(**json.loads(game_state_json))
+            game_state = GameState(**orjson.loads(game_state_json))
         
         room_dict = {
             "id": room_data["id"],
             "host_id": room_data["host_id"],
-            "settings": json.loads(room_data["settings"]),
+            "settings": orjson.loads(room_data["settings"]),
             "phase": room_data["phase"],
             "players": players,
             "game_state": game_state,
             "round_number": int(room_data.get("round_number", 0)),
-            "created_at": float(room_data["created_at"])
+            "created_at": float(room_data["created_at"]),
+            "version": int(room_data.get("version", 0))
         }
         
         return Room(**room_dict)
     
     @staticmethod
     async def _save_room(room: Room):
-        """Save room to Redis."""
+        """
+        Save room to Redis in one MULTI transaction.
+        The version is bumped with HINCRBY, like the Lua scripts do, so every
+        save gets a new version even if `room` was loaded before another change.
+        """
         redis = redis_client.client
         
         room_key = f"{RoomManager.ROOM_PREFIX}{room.id}"
         players_key = f"{RoomManager.ROOM_PLAYERS_PREFIX}{room.id}"
+        usernames_key = f"{RoomManager.ROOM_USERNAMES_PREFIX}{room.id}"
         
-        # Save room metadata
+        # Room metadata (the version is incremented separately)
         room_data = {
             "id": room.id,
             "host_id": room.host_id,
-            "settings": json.dumps(room.settings.dict()),
+            "settings": orjson.dumps(room.settings.model_dump(mode='json')),
             "phase": room.phase.value,
-            "game_state": json.dumps(room.game_state.dict()) if room.game_state else "",
+            "game_state": orjson.dumps(room.game_state.model_dump(mode='json')) if room.game_state else "",
             "round_number": str(room.round_number),
-            "created_at": str(room.created_at)
+            "created_at": str(room.created_at),
+            "ready_count": str(sum(1 for p in room.players.values() if p.is_ready))
         }
-        await redis.hset(room_key, mapping=room_data)
-        await redis.expire(room_key, RoomManager.ROOM_TTL)
         
-        # Save players
-        if room.players:
-            players_data = {
-                player_id: json.dumps(player.dict())
-                for player_id, player in room.players.items()
-            }
-            await redis.delete(players_key)  # Clear old players
-            await redis.hset(players_key, mapping=players_data)
-            await redis.expire(players_key, RoomManager.ROOM_TTL)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(room_key, mapping=room_data)
+            pipe.hincrby(room_key, "version", 1)
+            pipe.expire(room_key, RoomManager.ROOM_TTL)
+            
+            # Replace players and the username -> player_id index
+            if room.players:
+                players_data = {
+                    player_id: orjson.dumps(player.model_dump(mode='json'))
+                    for player_id, player in room.players.items()
+                }
+                usernames_data = {
+                    player.username: player_id
+                    for player_id, player in room.players.items()
+                }
+                pipe.delete(players_key, usernames_key)
+                pipe.hset(players_key, mapping=players_data)
+                pipe.hset(usernames_key, mapping=usernames_data)
+                pipe.expire(players_key, RoomManager.ROOM_TTL)
+                pipe.expire(usernames_key, RoomManager.ROOM_TTL)
+            
+            results = await pipe.execute()
+        
+        # Saving means the room was mutated, so its cached JSON is stale
+        room.version = int(results[1])
+        room.invalidate_json()
     
     @staticmethod
     async def update_room(room: Room):
@@ -144,10 +219,40 @@ class RoomManager:
         
         room_key = f"{RoomManager.ROOM_PREFIX}{room_id}"
         players_key = f"{RoomManager.ROOM_PLAYERS_PREFIX}{room_id}"
+        usernames_key = f"{RoomManager.ROOM_USERNAMES_PREFIX}{room_id}"
         
-        await redis.delete(room_key, players_key)
+        await redis.delete(room_key, players_key, usernames_key)
         await RoomManager._remove_from_public_rooms(room_id)
     
+    @staticmethod
+    async def get_counts(room_id: str) -> Optional[RoomCounts]:
+        """Get a room's host, player count and ready count (None if it doesn't exist)."""
+        redis = redis_client.client
+        room_key = f"{RoomManager.ROOM_PREFIX}{room_id}"
+        players_key = f"{RoomManager.ROOM_PLAYERS_PREFIX}{room_id}"
+        
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(room_key, "host_id", "ready_count")
+            pipe.hlen(players_key)
+            (host_id, ready_count), player_count = await pipe.execute()
+        
+        if host_id is None:
+            return None
+        if ready_count is None:
+            # Saved before ready_count existed: count the ready players
+            room = await RoomManager.get_room(room_id)
+            if room is None:
+                return None
+            ready_count = sum(1 for p in room.players.values() if p.is_ready)
+        return RoomCounts(host_id, player_count, int(ready_count))
+    
+    @staticmethod
+    async def find_player_id_by_username(room_id: str, username: str) -> Optional[str]:
+        """Get the player_id registered for a username in a room, if any."""
+        redis = redis_client.client
+        usernames_key = f"{RoomManager.ROOM_USERNAMES_PREFIX}{room_id}"
+        return await redis.hget(usernames_key, username)
+    
     @staticmethod
     async def add_player(room_id: str, player: Player):
         """Add a player to a room."""
@@ -160,21 +265,88 @@ class RoomManager:
         return room
     
     @staticmethod
-    async def remove_player(room_id: str, player_id: str):
-        """Remove a player from a room."""
-        room = await RoomManager.get_room(room_id)
-        if not room or player_id not in room.players:
+    async def join_room(room_id: str, player: Player, password: Optional[str]) -> Optional[JoinResult]:
+        """
+        Join a room in a single round-trip: reconnect the player already
+        registered with this username, or check the password and capacity
+        and add `player`.
+        Returns None if no room has this exact ID.
+        """
+        script = RoomManager._script(lua_scripts.JOIN_ROOM)
+        while True:
+            result = await script(
+                keys=[
+                    f"{RoomManager.ROOM_PREFIX}{room_id}",
+                    f"{RoomManager.ROOM_PLAYERS_PREFIX}{room_id}",
+                    f"{RoomManager.ROOM_USERNAMES_PREFIX}{room_id}",
+                    RoomManager.PUBLIC_ROOMS_SET,
+                ],
+                args=[room_id, player.username, password or "", player.id,
+                      orjson.dumps(player.model_dump(mode='json')), RoomManager.ROOM_TTL]
+            )
+            if not result or result[0] != 'id_taken':
+                break
+            # Never overwrite another player; retry with a fresh ID
+            player = player.model_copy(update={"id": RoomManager.generate_player_id()})
+        
+        if not result:
             return None
+        if len(result) == 1:
+            return JoinResult(result[0])
         
-        del room.players[player_id]
+        room = RoomManager._parse_room_pairs(result[2], result[3])
+        return JoinResult(result[0], result[1], room)
+    
+    @staticmethod
+    async def remove_player(room_id: str, player_id: str):
+        """Remove a player from a room."""
+        result = await RoomManager.remove_player_with_meta(room_id, player_id)
+        return result[2] if result else None
+    
+    @staticmethod
+    async def remove_player_with_meta(
+            room_id: str,
+            player_id: str) -> Optional[Tuple[str, int, Optional[Room]]]:
+        """
+        Atomically remove a player from a room in a single round-trip.
+        If the room becomes empty or the host left, the room is deleted.
         
-        # If room is empty or host left, delete room
-        if not room.players or player_id == room.host_id:
-            await RoomManager.delete_room(room_id)
+        Returns None if the room or player doesn't exist, otherwise
+        (host_id, player_count_before, room_after) where room_after is None
+        if the room was deleted.
+        """
+        script = RoomManager._script(lua_scripts.REMOVE_PLAYER)
+        result = await script(
+            keys=[
+                f"{RoomManager.ROOM_PREFIX}{room_id}",
+                f"{RoomManager.ROOM_PLAYERS_PREFIX}{room_id}",
+                f"{RoomManager.ROOM_USERNAMES_PREFIX}{room_id}",
+                RoomManager.PUBLIC_ROOMS_SET,
+            ],
+            args=[player_id, room_id, RoomManager.ROOM_TTL]
+        )
+        if not result:
             return None
         
-        await RoomManager.update_room(room)
-        return room
+        host_id, player_count_before = result[0], int(result[1])
+        if len(result) == 2:
+            return host_id, player_count_before, None
+        
+        room_after = RoomManager._parse_room_pairs(result[2], result[3])
+        return host_id, player_count_before, room_after
+    
+    @staticmethod
+    def _pairs_to_dict(pairs: List[str]) -> Dict[str, str]:
+        """Convert a flat [field, value, ...] array (Lua HGETALL) to a dict."""
+        return dict(zip(pairs[::2], pairs[1::2]))
+    
+    @staticmethod
+    def _parse_room_pairs(room_pairs: List[str], players_pairs: List[str]) -> Room:
+        """Build a Room from the flat HGETALL arrays returned by a Lua script."""
+        return RoomManager._parse_room(
+            RoomManager._pairs_to_dict(room_pairs),
+            RoomManager._pairs_to_dict(players_pairs)
+        )
     
     @staticmethod
     async def update_player(room_id: str, player_id: str, **updates):
@@ -192,15 +364,62 @@ class RoomManager:
         return room
     
     @staticmethod
-    async def update_player_username(room_id: str, player_id: str, new_username: str) -> Optional[Room]:
-        """Update a player's username."""
-        room = await RoomManager.get_room(room_id)
-        if not room or player_id not in room.players:
+    async def _run_room_script(source: str, room_id: str, *args) -> Optional[list]:
+        """Run a Lua script that updates a room's hashes (KEYS: room, players, usernames)."""
+        script = RoomManager._script(source)
+        return await script(
+            keys=[
+                f"{RoomManager.ROOM_PREFIX}{room_id}",
+                f"{RoomManager.ROOM_PLAYERS_PREFIX}{room_id}",
+                f"{RoomManager.ROOM_USERNAMES_PREFIX}{room_id}",
+            ],
+            args=[*args, RoomManager.ROOM_TTL]
+        )
+    
+    @staticmethod
+    async def toggle_player_ready(room_id: str, player_id: str) -> Optional[Room]:
+        """Atomically flip a player's ready status and return the updated room."""
+        result = await RoomManager._run_room_script(lua_scripts.TOGGLE_READY, room_id, player_id)
+        if not result:
             return None
+        return RoomManager._parse_room_pairs(result[0], result[1])
+    
+    @staticmethod
+    async def request_vote(room_id: str, player_id: str, now: float) -> Optional[Tuple[int, Room]]:
+        """
+        Atomically mark a player as wanting to vote, starting the voting phase
+        once a majority wants to.
         
-        room.players[player_id].username = new_username
-        await RoomManager.update_room(room)
-        return room
+        Returns None if the room doesn't exist, otherwise (status, room) where
+        status is 0 if nothing changed, 1 if the request was recorded and 2 if
+        voting started.
+        """
+        result = await RoomManager._run_room_script(lua_scripts.REQUEST_VOTE, room_id, player_id, now)
+        if not result:
+            return None
+        return int(result[0]), RoomManager._parse_room_pairs(result[1], result[2])
+    
+    @staticmethod
+    async def submit_vote(room_id: str, voter_id: str, voted_for_id: str) -> Optional[Tuple[bool, Room]]:
+        """
+        Atomically record a vote and update the submitted vote count.
+        
+        Returns None if the room doesn't exist, otherwise (recorded, room).
+        """
+        result = await RoomManager._run_room_script(lua_scripts.SUBMIT_VOTE, room_id, voter_id, voted_for_id)
+        if not result:
+            return None
+        return bool(result[0]), RoomManager._parse_room_pairs(result[1], result[2])
+    
+    @staticmethod
+    async def update_player_username(room_id: str, player_id: str, new_username: str) -> Optional[Room]:
+        """Atomically update a player's username and return the updated room."""
+        result = await RoomManager._run_room_script(
+            lua_scripts.RENAME_PLAYER, room_id, player_id, new_username
+        )
+        if not result:
+            return None
+        return RoomManager._parse_room_pairs(result[0], result[1])
     
     @staticmethod
     async def get_public_rooms() -> List[Dict]:
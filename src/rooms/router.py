@@ -11,7 +11,6 @@ from src.rooms.models import (
     RoomPhase
 )
 from src.rooms.redis_manager import RoomManager
-import secrets
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
@@ -21,7 +20,7 @@ async def create_room(request: CreateRoomRequest):
     """Create a new game room."""
     try:
         # Create host player
-        player_id = secrets.token_urlsafe(8)
+        player_id = RoomManager.generate_player_id()
         host_player = Player(
             id=player_id,
             username=request.username,
@@ -73,7 +72,7 @@ async def get_room(room_id: str):
             raise HTTPException(status_code=404, detail="Room not found")
         
         # Return full room state as dict
-        return room.dict()
+        return room.model_dump(mode='json')
     except HTTPException:
         raise
     except Exception as e:
@@ -107,7 +106,7 @@ async def join_room_rest(room_id: str, request: JoinRoomRequest):
             raise HTTPException(status_code=400, detail="Game already started")
         
         # Generate player_id for WebSocket connection
-        player_id = secrets.token_urlsafe(8)
+        player_id = RoomManager.generate_player_id()
         
         return {
             "room_id": room_id,
@@ -1,16 +1,122 @@
 """Connection-related Socket.IO event handlers."""
-import json
-from typing import Dict
+import asyncio
+import functools
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Coroutine, Optional, Set
 
-from src.sockets.server import sio
+import orjson
+
+from src.sockets.server import sio, USES_MESSAGE_QUEUE, USES_MSGPACK
 from src.redis.client import redis_client
+from src.sockets.redis_publisher import enqueue_publish
+from src.rooms.redis_manager import RoomManager
+from src.rooms.models import Room
 from src.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-# Store session data: sid -> {player_id, room_id, username}
+
+@dataclass(slots=True)
+class PlayerSession:
+    """Session data for a socket that joined a room."""
+    player_id: str
+    room_id: str
+    username: str
+
+
+class SessionStore:
+    """
+    Socket session storage: sid -> PlayerSession.
+    
+    Sessions live in Socket.IO's own per-client session
+    (sio.save_session/get_session). A socket's events are only ever handled
+    by the instance it is connected to, so reads never leave the process,
+    and Socket.IO discards the session when the client disconnects.
+    """
+    
+    async def get(self, sid: str) -> Optional[PlayerSession]:
+        """Get a socket's session (None if it hasn't joined a room)."""
+        try:
+            session = await sio.get_session(sid)
+        except KeyError:
+            # Not connected (or already gone)
+            return None
+        # get_session returns an empty dict when nothing was saved
+        return session if isinstance(session, PlayerSession) else None
+    
+    async def set(self, sid: str, session: PlayerSession):
+        """Store a socket's session."""
+        await sio.save_session(sid, session)
+    
+    async def pop(self, sid: str) -> Optional[PlayerSession]:
+        """Remove a socket's session and return it (None if there was none)."""
+        session = await self.get(sid)
+        if session is not None:
+            await sio.save_session(sid, {})
+        return session
+
+
+# Session access: sid -> PlayerSession
 # This is shared across all event modules
-sessions: Dict[str, dict] = {}
+sessions = SessionStore()
+
+
+def player_room(player_id: str) -> str:
+    """
+    Socket.IO room holding a player's sockets, for events meant for one
+    player. Unlike a sid, it's reachable from every instance when emits go
+    through the message queue.
+    """
+    return f"player:{player_id}"
+
+# Every Redis listener subscribes to this channel (nothing is published on
+# it), so PUBSUB NUMSUB on it tells how many backend instances are running.
+INSTANCES_CHANNEL = "pubsub:instances"
+
+# Tags this instance's published events; instances relay the rooms they
+# publish for, so the listener uses it to drop its own events
+INSTANCE_ID = secrets.token_hex(8)
+
+# How long the "are other instances running?" answer is cached (seconds)
+REMOTE_INSTANCES_CHECK_INTERVAL = 5.0
+
+_remote_instances_present = True
+_remote_instances_checked_at = 0.0
+
+# Set CROSS_INSTANCE_SYNC=0 on single-instance deployments to never publish
+CROSS_INSTANCE_SYNC = os.getenv("CROSS_INSTANCE_SYNC", "1") == "1"
+
+# Events other instances need to hear about. Ready and username changes are
+# only broadcast to the room by the instance that handled them.
+CROSS_INSTANCE_EVENTS = frozenset({'player_joined', 'player_left', 'room_closed', 'game_event'})
+
+# Rooms with sockets on this instance, i.e. whose events the Redis listener
+# relays, and the pending (subscribe?, room_id) changes for it to apply
+watched_rooms: Set[str] = set()
+room_subscription_changes: asyncio.Queue = asyncio.Queue()
+
+# Tasks started with fire() that haven't finished yet
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def handler_safe(event_name: str):
+    """
+    Wrap a (sid, data) event handler so any unhandled exception is logged
+    and reported to the client as an 'error' event.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(sid, data=None):
+            try:
+                return await fn(sid, data)
+            except Exception as e:
+                logger.exception("❌ Error in %s: %s", event_name, e)
+                await sio.emit('error', {'message': str(e)}, room=sid)
+        return wrapper
+    return deco
 
 
 @sio.event
@@ -28,29 +134,114 @@ async def disconnect(sid):
     # Import here to avoid circular dependency
     from src.sockets.room_events import handle_leave_room_internal
     
+    # Drop the session before any other await so nothing sees it half-gone
+    session = await sessions.pop(sid)
+    if session is None:
+        logger.debug("🔌 No session to clean up for sid=%s", sid)
+        return
+    
     # Auto leave room on disconnect
-    if sid in sessions:
-        session = sessions[sid]
-        room_id = session.get('room_id')
-        player_id = session.get('player_id')
-        username = session.get('username')
-        
-        if room_id and player_id:
-            logger.info(f"🔌 Auto-leaving room {room_id} for disconnected player {username}")
-            await handle_leave_room_internal(room_id, player_id, username)
+    if session.room_id and session.player_id:
+        logger.info(f"🔌 Auto-leaving room {session.room_id} for disconnected player {session.username}")
+        await handle_leave_room_internal(session.room_id, session.player_id, session.username)
         
-        del sessions[sid]
-        logger.debug(f"🔌 Session cleaned up for {username}")
-    else:
-        logger.debug(f"🔌 No session to clean up for sid={sid}")
+        # Leave the Socket.IO room now (rather than after this handler) so
+        # the room's events stop being relayed if it was the last local socket
+        await sio.leave_room(sid, session.room_id)
+        await sio.leave_room(sid, player_room(session.player_id))
+        unwatch_room_if_empty(session.room_id)
+    
+    logger.debug("🔌 Session cleaned up for %s", session.username)
+
+
+async def has_remote_instances() -> bool:
+    """
+    Check whether other backend instances are listening for published events.
+    The answer is cached for REMOTE_INSTANCES_CHECK_INTERVAL seconds so hot
+    handlers only pay for PUBSUB NUMSUB occasionally.
+    """
+    global _remote_instances_present, _remote_instances_checked_at
+    
+    now = time.monotonic()
+    if now - _remote_instances_checked_at >= REMOTE_INSTANCES_CHECK_INTERVAL:
+        _remote_instances_checked_at = now
+        try:
+            redis = redis_client.client
+            [(_, listeners)] = await redis.pubsub_numsub(INSTANCES_CHANNEL)
+            # This instance's own listener is one of them
+            _remote_instances_present = listeners > 1
+        except Exception as e:
+            logger.error(f"❌ Failed to count backend instances: {e}")
+            _remote_instances_present = True
+    
+    return _remote_instances_present
+
+
+def fire(coro: Coroutine) -> asyncio.Task:
+    """
+    Run a coroutine in the background without making the caller wait for it.
+    Exceptions are logged, and a reference is kept until the task is done so
+    it can't be garbage collected mid-flight.
+    """
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+
+def _on_background_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background task failed: {task.exception()}")
+
+
+def watch_room(room_id: str):
+    """Start relaying a room's events (a socket on this instance joined it)."""
+    if room_id not in watched_rooms:
+        watched_rooms.add(room_id)
+        room_subscription_changes.put_nowait((True, room_id))
+
+
+def unwatch_room_if_empty(room_id: str):
+    """Stop relaying a room's events once no socket on this instance is in it."""
+    if room_id not in watched_rooms:
+        return
+    if next(sio.manager.get_participants('/', room_id), None) is not None:
+        return
+    watched_rooms.discard(room_id)
+    room_subscription_changes.put_nowait((False, room_id))
+
+
+def room_state_payload(room: Room):
+    """
+    Get a room's full state for emitting: the cached JSON fragment, or a
+    plain dict when emits go through the Redis message queue, which pickles
+    payloads, or are encoded with msgpack (fragments are JSON-only).
+    """
+    if USES_MESSAGE_QUEUE or USES_MSGPACK:
+        return room.model_dump(mode='json')
+    return room.json_fragment()
 
 
 async def publish_event(event_type: str, data: dict):
-    """Publish event to Redis Pub/Sub for cross-instance sync."""
+    """
+    Publish event to Redis Pub/Sub for cross-instance sync.
+    Events are handed to the batching publisher when it's running, so
+    bursts go out in one pipelined round-trip.
+    Skipped when Socket.IO runs on the Redis message queue (room emits
+    already reach every instance), when sync is disabled, for events not in
+    CROSS_INSTANCE_EVENTS, and when no other instance is listening.
+    """
+    if USES_MESSAGE_QUEUE or not CROSS_INSTANCE_SYNC or event_type not in CROSS_INSTANCE_EVENTS:
+        return
+    
     try:
-        redis = redis_client.client
-        channel = f"pubsub:{event_type}"
-        message = json.dumps(data)
-        await redis.publish(channel, message)
+        if not await has_remote_instances():
+            return
+        
+        channel = f"pubsub:{event_type}:{data['room_id']}"
+        message = orjson.dumps({**data, 'instance_id': INSTANCE_ID})  # bytes are published as-is
+        if not enqueue_publish(channel, message):
+            await redis_client.client.publish(channel, message)
     except Exception as e:
         logger.error(f"❌ Failed to publish event to Redis: {e}")
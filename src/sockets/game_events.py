@@ -1,5 +1,7 @@
 """Game-related Socket.IO event handlers."""
 import asyncio
+import time
+from typing import Dict
 
 from src.sockets.server import sio
 from src.rooms.redis_manager import RoomManager
@@ -15,12 +17,33 @@ from src.game.logic import (
     PLAYING_DURATION,
     VOTING_DURATION,
 )
-from src.sockets.connection_events import sessions, publish_event
+from src.sockets.connection_events import (
+    sessions,
+    publish_event,
+    handler_safe,
+    fire,
+    player_room,
+    room_state_payload,
+)
 
 logger = get_logger(__name__)
 
+# Phases bound to module globals once, for the comparisons made on every event
+_WAITING = RoomPhase.WAITING
+_ROLE_REVEAL = RoomPhase.ROLE_REVEAL
+_PLAYING = RoomPhase.PLAYING
+_VOTING = RoomPhase.VOTING
+_RESULTS = RoomPhase.RESULTS
+
+# Phases where every player sees the same room state
+_SHARED_STATE_PHASES = frozenset((_WAITING, _RESULTS))
+
+# Pending automatic phase transition per room: room_id -> task
+room_timers: Dict[str, asyncio.Task] = {}
+
 
 @sio.event
+@handler_safe('game_event')
 async def game_event(sid, data):
     """
     Broadcast a game event to the room.
@@ -32,45 +55,42 @@ async def game_event(sid, data):
         "payload": { ... }
     }
     """
-    try:
-        room_id = data.get('room_id')
-        event_type = data.get('event_type')
-        payload = data.get('payload', {})
-        
-        if not room_id or not event_type:
-            await sio.emit('error', {'message': 'room_id and event_type required'}, room=sid)
-            return
-        
-        # Verify player is in room
-        if sid not in sessions or sessions[sid].get('room_id') != room_id:
-            await sio.emit('error', {'message': 'Not in this room'}, room=sid)
-            return
-        
-        player_id = sessions[sid]['player_id']
-        
-        # Broadcast to room
-        event_data = {
-            'event_type': event_type,
-            'player_id': player_id,
-            'payload': payload
-        }
-        
-        await sio.emit('game_event', event_data, room=room_id)
-        
-        # Publish to Redis for cross-instance sync
-        await publish_event('game_event', {
-            'room_id': room_id,
-            **event_data
-        })
-        
-        logger.info(f"📢 Game event '{event_type}' in room {room_id} from {player_id}")
-        
-    except Exception as e:
-        logger.exception(f"❌ Error in game_event: {e}")
-        await sio.emit('error', {'message': str(e)}, room=sid)
+    room_id = data.get('room_id')
+    event_type = data.get('event_type')
+    payload = data.get('payload', {})
+    
+    if not room_id or not event_type:
+        await sio.emit('error', {'message': 'room_id and event_type required'}, room=sid)
+        return
+    
+    # Verify player is in room
+    session = await sessions.get(sid)
+    if session is None or session.room_id != room_id:
+        await sio.emit('error', {'message': 'Not in this room'}, room=sid)
+        return
+    
+    player_id = session.player_id
+    
+    # Broadcast to room
+    event_data = {
+        'event_type': event_type,
+        'player_id': player_id,
+        'payload': payload
+    }
+    
+    await sio.emit('game_event', event_data, room=room_id)
+    
+    # Publish to Redis for cross-instance sync in the background
+    fire(publish_event('game_event', {
+        'room_id': room_id,
+        **event_data
+    }))
+    
+    logger.debug("📢 Game event %r in room %s from %s", event_type, room_id, player_id)
 
 
 @sio.event
+@handler_safe('start_game')
 async def start_game(sid, data):
     """
     Start the game (host only).
@@ -89,83 +109,81 @@ async def start_game(sid, data):
         }
     }
     """
-    try:
-        logger.debug(f"🎮 start_game event from sid={sid}")
-        
-        if sid not in sessions:
-            await sio.emit('error', {'message': 'No session found'}, room=sid)
-            return
-        
-        session = sessions[sid]
-        room_id = session.get('room_id')
-        player_id = session.get('player_id')
-        
-        if not room_id:
-            await sio.emit('error', {'message': 'Not in a room'}, room=sid)
-            return
-        
-        # Get room
-        room = await RoomManager.get_room(room_id)
-        if not room:
-            await sio.emit('error', {'message': 'Room not found'}, room=sid)
-            return
-        
-        # Only host can start
-        if player_id != room.host_id:
-            await sio.emit('error', {'message': 'Only the host can start the game'}, room=sid)
-            return
-        
-        # Check all players are ready
-        players_list = list(room.players.values())
-        if len(players_list) < 3:
-            await sio.emit('error', {'message': 'Need at least 3 players to start'}, room=sid)
-            return
-        
-        all_ready = all(p.is_ready for p in players_list)
-        if not all_ready:
-            await sio.emit('error', {'message': 'All players must be ready'}, room=sid)
-            return
-        
-        # Update room settings from host's choices
-        if 'category_ids' in data:
-            room.settings.category_ids = data['category_ids']
-        elif 'category_id' in data:
-            # Backwards compatibility
-            room.settings.category_ids = [data['category_id']]
-        
-        settings = data.get('settings', {})
-        if settings:
-            room.settings.detective_enabled = settings.get('detective_enabled', False)
-            room.settings.joker_enabled = settings.get('joker_enabled', False)
-            room.settings.voting_time = settings.get('voting_time', 60)
-            room.settings.discussion_timer_enabled = settings.get('discussion_timer_enabled', False)
-            room.settings.discussion_time = settings.get('discussion_time', 300)
-        
-        # Save updated settings before starting game
-        await RoomManager.update_room(room)
-        
-        # Start game
-        language = data.get('language', 'es')
-        room = await logic_start_game(room, language)
-        
-        if not room:
-            await sio.emit('error', {'message': 'Failed to start game'}, room=sid)
-            return
-        
-        logger.info(f"🎮 Game started in room {room_id} with detective={room.settings.detective_enabled}, joker={room.settings.joker_enabled}")
-        
-        # Send personalized room state to each player (with their role/word)
-        await broadcast_personalized_game_state(room)
-        
-        # Schedule transition to PLAYING phase after ROLE_REVEAL_DURATION
-        asyncio.create_task(schedule_phase_transition(room_id, RoomPhase.PLAYING, ROLE_REVEAL_DURATION))
-        
-    except Exception as e:
-        logger.exception(f"❌ Error in start_game: {e}")
-        await sio.emit('error', {'message': str(e)}, room=sid)
+    logger.debug("🎮 start_game event from sid=%s", sid)
+    
+    session = await sessions.get(sid)
+    if session is None:
+        await sio.emit('error', {'message': 'No session found'}, room=sid)
+        return
+    
+    room_id = session.room_id
+    player_id = session.player_id
+    
+    if not room_id:
+        await sio.emit('error', {'message': 'Not in a room'}, room=sid)
+        return
+    
+    # Check host and readiness from the stored counts, before loading the
+    # whole room
+    counts = await RoomManager.get_counts(room_id)
+    if not counts:
+        await sio.emit('error', {'message': 'Room not found'}, room=sid)
+        return
+    
+    # Only host can start
+    if player_id != counts.host_id:
+        await sio.emit('error', {'message': 'Only the host can start the game'}, room=sid)
+        return
+    
+    # Check all players are ready
+    if counts.player_count < 3:
+        await sio.emit('error', {'message': 'Need at least 3 players to start'}, room=sid)
+        return
+    
+    if counts.ready_count != counts.player_count:
+        await sio.emit('error', {'message': 'All players must be ready'}, room=sid)
+        return
+    
+    # Get room
+    room = await RoomManager.get_room(room_id)
+    if not room:
+        await sio.emit('error', {'message': 'Room not found'}, room=sid)
+        return
+    
+    # Update room settings from host's choices
+    if 'category_ids' in data:
+        room.settings.category_ids = data['category_ids']
+    elif 'category_id' in data:
+        # Backwards compatibility
+        room.settings.category_ids = [data['category_id']]
+    
+    settings = data.get('settings', {})
+    if settings:
+        room.settings.detective_enabled = settings.get('detective_enabled', False)
+        room.settings.joker_enabled = settings.get('joker_enabled', False)
+        room.settings.voting_time = settings.get('voting_time', 60)
+        room.settings.discussion_timer_enabled = settings.get('discussion_timer_enabled', False)
+        room.settings.discussion_time = settings.get('discussion_time', 300)
+    
+    # Start game (saves the settings above together with the new game state)
+    language = data.get('language', 'es')
+    room = await logic_start_game(room, language)
+    
+    if not room:
+        await sio.emit('error', {'message': 'Failed to start game'}, room=sid)
+        return
+    
+    logger.info(f"🎮 Game started in room {room_id} with detective={room.settings.detective_enabled}, joker={room.settings.joker_enabled}")
+    
+    # Send personalized room state to each player (with their role/word)
+    await broadcast_personalized_game_state(room)
+    
+    # Schedule transition to PLAYING phase after ROLE_REVEAL_DURATION
+    start_phase_timer(room_id, _PLAYING, ROLE_REVEAL_DURATION)
 
 
 @sio.event
+@handler_safe('request_vote')
 async def request_vote(sid, data):
     """
     Request to start voting phase.
@@ -175,46 +193,41 @@ async def request_vote(sid, data):
         "room_id": "abc123"
     }
     """
-    try:
-        logger.debug(f"🗳️ request_vote event from sid={sid}")
-        
-        if sid not in sessions:
-            await sio.emit('error', {'message': 'No session found'}, room=sid)
-            return
-        
-        session = sessions[sid]
-        room_id = session.get('room_id')
-        player_id = session.get('player_id')
-        
-        if not room_id:
-            await sio.emit('error', {'message': 'Not in a room'}, room=sid)
-            return
-        
-        room = await RoomManager.get_room(room_id)
-        if not room:
-            await sio.emit('error', {'message': 'Room not found'}, room=sid)
-            return
-        
-        if room.phase != RoomPhase.PLAYING:
-            await sio.emit('error', {'message': 'Can only request vote during playing phase'}, room=sid)
-            return
-        
-        room, should_start_voting = await request_voting(room, player_id)
-        
-        # Broadcast updated state
-        await broadcast_personalized_game_state(room)
-        
-        if should_start_voting:
-            logger.info(f"🗳️ Voting phase started in room {room_id}")
-            # Schedule voting timeout
-            asyncio.create_task(schedule_phase_transition(room_id, RoomPhase.RESULTS, VOTING_DURATION))
-        
-    except Exception as e:
-        logger.exception(f"❌ Error in request_vote: {e}")
-        await sio.emit('error', {'message': str(e)}, room=sid)
+    logger.debug("🗳️ request_vote event from sid=%s", sid)
+    
+    session = await sessions.get(sid)
+    if session is None:
+        await sio.emit('error', {'message': 'No session found'}, room=sid)
+        return
+    
+    room_id = session.room_id
+    player_id = session.player_id
+    
+    if not room_id:
+        await sio.emit('error', {'message': 'Not in a room'}, room=sid)
+        return
+    
+    # Record the request (and start voting on majority) in one atomic step
+    room, should_start_voting = await request_voting(room_id, player_id)
+    if not room:
+        await sio.emit('error', {'message': 'Room not found'}, room=sid)
+        return
+    
+    if room.phase != _PLAYING and not should_start_voting:
+        await sio.emit('error', {'message': 'Can only request vote during playing phase'}, room=sid)
+        return
+    
+    # Broadcast updated state
+    await broadcast_personalized_game_state(room)
+    
+    if should_start_voting:
+        logger.info(f"🗳️ Voting phase started in room {room_id}")
+        # Schedule voting timeout
+        start_phase_timer(room_id, _RESULTS, VOTING_DURATION)
 
 
-@sio.event 
+@sio.event
+@handler_safe('vote')
 async def vote(sid, data):
     """
     Submit a vote.
@@ -225,85 +238,99 @@ async def vote(sid, data):
         "voted_for_id": "player_id"
     }
     """
-    try:
-        logger.debug(f"🗳️ vote event from sid={sid}")
-        
-        if sid not in sessions:
-            await sio.emit('error', {'message': 'No session found'}, room=sid)
-            return
-        
-        session = sessions[sid]
-        room_id = session.get('room_id')
-        voter_id = session.get('player_id')
-        voted_for_id = data.get('voted_for_id')
-        
-        if not room_id or not voted_for_id:
-            await sio.emit('error', {'message': 'room_id and voted_for_id required'}, room=sid)
-            return
-        
-        room = await RoomManager.get_room(room_id)
-        if not room:
-            await sio.emit('error', {'message': 'Room not found'}, room=sid)
-            return
-        
-        if room.phase != RoomPhase.VOTING:
-            await sio.emit('error', {'message': 'Can only vote during voting phase'}, room=sid)
-            return
-        
-        room, all_voted = await submit_vote(room, voter_id, voted_for_id)
-        
-        # Broadcast vote count update
-        await sio.emit('vote_update', {
-            'votes_submitted': room.game_state.votes_submitted,
-            'total_players': len(room.players)
-        }, room=room_id)
-        
-        if all_voted:
-            # All votes in - calculate results immediately
-            room = await calculate_results(room)
-            await broadcast_personalized_game_state(room)
-            logger.info(f"🎉 Game ended in room {room_id}: {room.game_state.result}")
-        
-    except Exception as e:
-        logger.exception(f"❌ Error in vote: {e}")
-        await sio.emit('error', {'message': str(e)}, room=sid)
+    logger.debug("🗳️ vote event from sid=%s", sid)
+    
+    session = await sessions.get(sid)
+    if session is None:
+        await sio.emit('error', {'message': 'No session found'}, room=sid)
+        return
+    
+    room_id = session.room_id
+    voter_id = session.player_id
+    voted_for_id = data.get('voted_for_id')
+    
+    if not room_id or not voted_for_id:
+        await sio.emit('error', {'message': 'room_id and voted_for_id required'}, room=sid)
+        return
+    
+    # Record the vote and update the vote count in one atomic step
+    room, all_voted = await submit_vote(room_id, voter_id, voted_for_id)
+    if not room:
+        await sio.emit('error', {'message': 'Room not found'}, room=sid)
+        return
+    
+    if room.phase != _VOTING:
+        await sio.emit('error', {'message': 'Can only vote during voting phase'}, room=sid)
+        return
+    
+    # Broadcast vote count update
+    vote_update = sio.emit('vote_update', {
+        'votes_submitted': room.game_state.votes_submitted,
+        'total_players': len(room.players)
+    }, room=room_id)
+    
+    if all_voted:
+        # All votes in - calculate results immediately (the voting timeout is
+        # no longer needed), overlapping it with the vote count broadcast
+        cancel_phase_timer(room_id)
+        _, room = await asyncio.gather(vote_update, calculate_results(room))
+        await broadcast_personalized_game_state(room)
+        logger.info(f"🎉 Game ended in room {room_id}: {room.game_state.result}")
+    else:
+        await vote_update
 
 
 async def broadcast_personalized_game_state(room):
     """
-    Send personalized room state to each player.
-    Each player only sees their own role and word.
+    Send the room state to the room, with roles and words masked, and send
+    each player their own role and word in a small 'your_role' event.
+    In the lobby there are no roles and in the results phase everything is
+    revealed, so the same full state is sent once to everyone.
     """
-    room_dict = room.dict()
+    if room.phase in _SHARED_STATE_PHASES:
+        await sio.emit('room_state', room_state_payload(room), room=room.id)
+        return
     
-    # For each connected player, send personalized state
-    for sid, session in sessions.items():
-        if session.get('room_id') != room.id:
-            continue
-        
-        player_id = session.get('player_id')
-        if player_id not in room.players:
-            continue
-        
-        # Create personalized room dict
-        personalized = room_dict.copy()
-        personalized['players'] = {}
-        
-        for pid, player in room.players.items():
-            player_dict = player.dict()
-            
-            # Only include role and word for the current player
-            if pid != player_id:
-                player_dict['role'] = None
-                player_dict['word'] = None
-            
-            personalized['players'][pid] = player_dict
-        
-        # Don't reveal impostor_id in game_state during play
-        if personalized.get('game_state') and room.phase != RoomPhase.RESULTS:
-            personalized['game_state']['impostor_id'] = None
-        
-        await sio.emit('room_state', personalized, room=sid)
+    room_dict = room.model_dump(mode='json')
+    players = room_dict['players']
+    
+    # Mask every role and word, and don't reveal impostor_id during play
+    masked_room = {
+        **room_dict,
+        'players': {
+            pid: {**player_dict, 'role': None, 'word': None}
+            for pid, player_dict in players.items()
+        }
+    }
+    if room_dict.get('game_state'):
+        masked_room['game_state'] = {**room_dict['game_state'], 'impostor_id': None}
+    
+    await sio.emit('room_state', masked_room, room=room.id)
+    
+    # Private reveal for each player, sent to their player room so it
+    # reaches them on whichever instance they're connected to
+    reveals = [
+        sio.emit('your_role', {
+            'role': player_dict['role'],
+            'word': player_dict['word']
+        }, room=player_room(pid))
+        for pid, player_dict in players.items()
+    ]
+    
+    await asyncio.gather(*reveals)
+
+
+def start_phase_timer(room_id: str, next_phase: RoomPhase, delay: int):
+    """Schedule a room's next automatic phase transition, replacing any pending one."""
+    cancel_phase_timer(room_id)
+    room_timers[room_id] = asyncio.create_task(schedule_phase_transition(room_id, next_phase, delay))
+
+
+def cancel_phase_timer(room_id: str):
+    """Cancel a room's pending automatic phase transition, if any."""
+    task = room_timers.pop(room_id, None)
+    if task is not None:
+        task.cancel()
 
 
 async def schedule_phase_transition(room_id: str, next_phase: RoomPhase, delay: int):
@@ -313,33 +340,36 @@ async def schedule_phase_transition(room_id: str, next_phase: RoomPhase, delay:
     """
     await asyncio.sleep(delay)
     
+    # The timer has fired; drop it so scheduling the next one doesn't cancel this task
+    if room_timers.get(room_id) is asyncio.current_task():
+        del room_timers[room_id]
+    
     room = await RoomManager.get_room(room_id)
     if not room:
         return
     
     # Check if transition is still valid
-    if next_phase == RoomPhase.PLAYING and room.phase == RoomPhase.ROLE_REVEAL:
+    if next_phase == _PLAYING and room.phase == _ROLE_REVEAL:
         room = await transition_to_playing(room)
         await broadcast_personalized_game_state(room)
         logger.info(f"🎮 Room {room_id} auto-transitioned to PLAYING phase")
         
         # Schedule voting phase timeout (5 minutes)
-        asyncio.create_task(schedule_phase_transition(room_id, RoomPhase.VOTING, PLAYING_DURATION))
+        start_phase_timer(room_id, _VOTING, PLAYING_DURATION)
         
-    elif next_phase == RoomPhase.VOTING and room.phase == RoomPhase.PLAYING:
+    elif next_phase == _VOTING and room.phase == _PLAYING:
         # Time's up - force voting phase
-        room.phase = RoomPhase.VOTING
+        room.phase = _VOTING
         if room.game_state:
-            import time
             room.game_state.phase_start_time = time.time()
         await RoomManager.update_room(room)
         await broadcast_personalized_game_state(room)
         logger.info(f"⏰ Room {room_id} time's up - forced VOTING phase")
         
         # Schedule voting timeout
-        asyncio.create_task(schedule_phase_transition(room_id, RoomPhase.RESULTS, VOTING_DURATION))
+        start_phase_timer(room_id, _RESULTS, VOTING_DURATION)
         
-    elif next_phase == RoomPhase.RESULTS and room.phase == RoomPhase.VOTING:
+    elif next_phase == _RESULTS and room.phase == _VOTING:
         # Voting time's up - calculate results
         room = await calculate_results(room)
         await broadcast_personalized_game_state(room)
@@ -1,69 +1,145 @@
 """Redis Pub/Sub listener for cross-instance event synchronization."""
-import json
 import asyncio
+from typing import List
+
+import orjson
+
 from src.redis.client import redis_client
 from src.sockets.server import sio
+from src.sockets.connection_events import (
+    CROSS_INSTANCE_EVENTS,
+    INSTANCES_CHANNEL,
+    INSTANCE_ID,
+    watched_rooms,
+    room_subscription_changes,
+)
 from src.logging_config import get_logger
 
 
 logger = get_logger(__name__)
 
+# Events are published on pubsub:{event_type}:{room_id}
+CHANNEL_PREFIX = "pubsub:"
+_CHANNEL_PREFIX_LEN = len(CHANNEL_PREFIX)
+
+# How often the listener checks for subscription changes while idle (seconds)
+SUBSCRIPTION_POLL_INTERVAL = 0.05
+
+
+def _room_channels(room_id: str) -> List[str]:
+    """
+    Exact channels of a room's relayed events. Plain SUBSCRIBE instead of a
+    pattern, since Redis matches every PUBLISH against every pattern.
+    """
+    return [f"{CHANNEL_PREFIX}{event_type}:{room_id}" for event_type in CROSS_INSTANCE_EVENTS]
+
+
+async def _handle_player_joined(room_id: str, data: dict):
+    await sio.emit('player_joined', {
+        'player_id': data['player_id'],
+        'username': data['username']
+    }, room=room_id)
+
+
+async def _handle_player_left(room_id: str, data: dict):
+    # Delta only; the room state isn't published
+    await sio.emit('room_update', {
+        'type': 'player_left',
+        'delta': {
+            'player_id': data['player_id'],
+            'username': data['username']
+        }
+    }, room=room_id)
+
+
+async def _handle_room_closed(room_id: str, data: dict):
+    await sio.emit('room_closed', {
+        'room_id': room_id,
+        'reason': data['reason']
+    }, room=room_id)
+
+
+async def _handle_game_event(room_id: str, data: dict):
+    await sio.emit('game_event', {
+        'event_type': data['event_type'],
+        'player_id': data['player_id'],
+        'payload': data['payload']
+    }, room=room_id)
+
+
+# Relayed event type -> handler(room_id, data)
+HANDLERS = {
+    'player_joined': _handle_player_joined,
+    'player_left': _handle_player_left,
+    'room_closed': _handle_room_closed,
+    'game_event': _handle_game_event,
+}
+
 
 async def redis_listener():
     """
     Listen to Redis Pub/Sub channels and broadcast events to Socket.IO clients.
     This enables multiple backend instances to stay in sync.
+    Only rooms with sockets on this instance are subscribed to, so events of
+    other rooms never reach this instance.
     """
     logger.info("🎧 Starting Redis Pub/Sub listener...")
     
     try:
         pubsub = await redis_client.pubsub()
         
-        # Subscribe to all pubsub:* channels
-        await pubsub.psubscribe("pubsub:*")
+        # Announce this instance
+        await pubsub.subscribe(INSTANCES_CHANNEL)
+        
+        # Subscribe to every room we relay (e.g. after a reconnect); changes
+        # queued before now are covered by that
+        while not room_subscription_changes.empty():
+            room_subscription_changes.get_nowait()
+        for room_id in list(watched_rooms):
+            await pubsub.subscribe(*_room_channels(room_id))
         
-        logger.info("✅ Subscribed to pubsub:* channels")
+        logger.info(f"✅ Subscribed to events of {len(watched_rooms)} rooms")
         
-        async for message in pubsub.listen():
-            if message['type'] == 'pmessage':
-                try:
-                    # Parse channel and data
-                    channel = message['channel']
-                    event_type = channel.split(':', 1)[1] if ':' in channel else 'unknown'
-                    data = json.loads(message['data'])
-                    
-                    # Get room_id from data
-                    room_id = data.get('room_id')
-                    
-                    if not room_id:
-                        continue
-                    
-                    # Broadcast to Socket.IO room based on event type
-                    if event_type == 'player_joined':
-                        await sio.emit('player_joined', {
-                            'player_id': data['player_id'],
-                            'username': data['username']
-                        }, room=room_id)
-                    
-                    elif event_type == 'player_left':
-                        await sio.emit('player_left', {
-                            'player_id': data['player_id'],
-                            'username': data['username']
-                        }, room=room_id)
-                    
-                    elif event_type == 'game_event':
-                        await sio.emit('game_event', {
-                            'event_type': data['event_type'],
-                            'player_id': data['player_id'],
-                            'payload': data['payload']
-                        }, room=room_id)
-                    
-                    logger.debug(f"📡 Broadcast Redis event '{event_type}' to room {room_id}")
-                    
-                except json.JSONDecodeError:
-                    logger.warning(f"⚠️ Failed to parse Redis message: {message['data']}")
-                except Exception as e:
-                    logger.error(f"❌ Error processing Redis message: {e}")
+        while True:
+            # Apply subscription changes between messages, so the pubsub
+            # connection is only ever used from this task
+            while not room_subscription_changes.empty():
+                subscribe, room_id = room_subscription_changes.get_nowait()
+                if subscribe:
+                    await pubsub.subscribe(*_room_channels(room_id))
+                else:
+                    await pubsub.unsubscribe(*_room_channels(room_id))
+            
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=SUBSCRIPTION_POLL_INTERVAL
+            )
+            if message is None or message['type'] != 'message':
+                continue
+            
+            try:
+                # Look the handler up before parsing, so events nobody
+                # relays are never decoded
+                event_type, _, room_id = message['channel'][_CHANNEL_PREFIX_LEN:].partition(':')
+                handler = HANDLERS.get(event_type)
+                if handler is None or not room_id:
+                    continue
+                
+                data = orjson.loads(message['data'])
+                
+                # This instance already emitted its own events locally
+                if data.get('instance_id') == INSTANCE_ID:
+                    continue
+                
+                # Broadcast to Socket.IO room
+                await handler(room_id, data)
+                
+                logger.debug("📡 Broadcast Redis event %r to room %s", event_type, room_id)
+                
+            except orjson.JSONDecodeError:
+                logger.warning(f"⚠️ Failed to parse Redis message: {message['data']}")
+            except Exception as e:
+                logger.error(f"❌ Error processing Redis message: {e}")
     
     except Exception as e:
         logger.error(f"❌ Redis listener error: {e}")
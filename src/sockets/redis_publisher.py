@@ -0,0 +1,67 @@
+"""Batched Redis publisher for cross-instance event synchronization."""
+import asyncio
+from typing import List, Optional, Tuple
+
+from src.redis.client import redis_client
+from src.logging_config import get_logger
+
+
+logger = get_logger(__name__)
+
+# How long to wait for more events before flushing a batch (seconds)
+PUBLISH_FLUSH_INTERVAL = 0.002
+
+# Pending (channel, message) publishes; None until the publisher is running
+_queue: Optional[asyncio.Queue] = None
+
+
+def enqueue_publish(channel: str, message: bytes) -> bool:
+    """
+    Queue a message for the background publisher.
+    Returns False if the publisher isn't running, so the caller can publish
+    directly instead.
+    """
+    if _queue is None:
+        return False
+    _queue.put_nowait((channel, message))
+    return True
+
+
+async def redis_publisher():
+    """
+    Drain queued events and send each batch to Redis in one pipelined
+    round-trip instead of one PUBLISH round-trip per event.
+    """
+    global _queue
+    _queue = asyncio.Queue()
+    logger.info("📤 Starting Redis publisher...")
+    
+    try:
+        while True:
+            batch = [await _queue.get()]
+            
+            # Give events from the same burst a chance to join the batch
+            await asyncio.sleep(PUBLISH_FLUSH_INTERVAL)
+            while not _queue.empty():
+                batch.append(_queue.get_nowait())
+            
+            try:
+                await _publish_batch(batch)
+            except Exception as e:
+                logger.error(f"❌ Failed to publish {len(batch)} events to Redis: {e}")
+    finally:
+        _queue = None
+
+
+async def _publish_batch(batch: List[Tuple[str, bytes]]):
+    """Publish a batch of messages, pipelined when there's more than one."""
+    redis = redis_client.client
+    if len(batch) == 1:
+        channel, message = batch[0]
+        await redis.publish(channel, message)
+        return
+    
+    async with redis.pipeline(transaction=False) as pipe:
+        for channel, message in batch:
+            pipe.publish(channel, message)
+        await pipe.execute()
@@ -1,14 +1,51 @@
 """Socket.IO server configuration."""
+import os
+
+import orjson
 import socketio
 from src.logging_config import get_logger
 
 
 logger = get_logger(__name__)
 
+
+class OrjsonSerializer:
+    """json-module compatible wrapper so Socket.IO encodes packets with orjson."""
+    
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        # orjson output is always compact, so `separators` & co. are ignored
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+# Same allowed origins as the HTTP API's CORS middleware
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+
+# Optional Redis message queue: when set, emits to a room reach its clients
+# on every instance, so events don't need to be relayed by hand
+MESSAGE_QUEUE_URL = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+USES_MESSAGE_QUEUE = bool(MESSAGE_QUEUE_URL)
+
+# Optional msgpack packet encoding (smaller frames than JSON). Clients must
+# use socket.io-msgpack-parser to match, so it's opt-in.
+USES_MSGPACK = os.getenv("SOCKETIO_SERIALIZER") == "msgpack"
+
+# Accepted transports, e.g. "websocket" to skip the long-polling handshake
+# and upgrade (clients must then connect with the websocket transport)
+TRANSPORTS = os.getenv("SOCKETIO_TRANSPORTS", "polling,websocket").split(",")
+
 # Create Socket.IO async server
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins='*',  # Update in production
+    cors_allowed_origins=CORS_ORIGINS,
+    json=OrjsonSerializer,
+    serializer='msgpack' if USES_MSGPACK else 'default',
+    transports=TRANSPORTS,
+    client_manager=socketio.AsyncRedisManager(MESSAGE_QUEUE_URL) if USES_MESSAGE_QUEUE else None,
     logger=False,
     engineio_logger=False
 )
@@ -1,5 +1,8 @@
 from src.words.models import Word, WordTranslation
 from src.words.schemas import (
+    WORD_LIST_ADAPTER,
+    WORD_TRANSLATION_LIST_ADAPTER,
+    LanguageCode,
     WordBase,
     WordCreate,
     WordLocalized,
@@ -26,8 +29,12 @@ __all__ = [
     "WordWithCategory",
     "WordLocalized",
     # Schemas - WordTranslation
+    "LanguageCode",
     "WordTranslationBase",
     "WordTranslationCreate",
     "WordTranslationUpdate",
     "WordTranslationResponse",
+    # Schemas - list adapters
+    "WORD_LIST_ADAPTER",
+    "WORD_TRANSLATION_LIST_ADAPTER",
 ]
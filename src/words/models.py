@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import CHAR, Column, ForeignKey, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from src.database import Base
@@ -17,7 +17,9 @@ class Word(Base):
     category = relationship("Category", back_populates="words")
     
     # Relationship with WordTranslation (one-to-many)
-    translations = relationship("WordTranslation", back_populates="word", cascade="all, delete-orphan")
+    translations = relationship(
+        "WordTranslation", back_populates="word", cascade="all, delete-orphan", passive_deletes=True
+    )
     
     def __repr__(self):
         return f"<Word(id={self.id}, key='{self.key}', category_id={self.category_id})>"
@@ -27,10 +29,12 @@ class WordTranslation(Base):
     """WordTranslation model for word translations."""
     
     __tablename__ = "word_translation"
+    # One translation per language; its index also serves (word_id, language) lookups
+    __table_args__ = (UniqueConstraint("word_id", "language"),)
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    word_id = Column(Integer, ForeignKey("word.id"), nullable=False)
-    language = Column(String(5), nullable=False, index=True)  # "es", "en", etc.
+    word_id = Column(Integer, ForeignKey("word.id", ondelete="CASCADE"), nullable=False)
+    language = Column(CHAR(2), nullable=False)  # "es", "en", etc.
     value = Column(String(200), nullable=False)
     
     # Relationship with Word (many-to-one)
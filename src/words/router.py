@@ -1,52 +1,146 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
 
+from src.categories.models import Category
 from src.database import get_db
+from src.redis.cache import cache_delete, cache_get, cache_set
 from src.words.models import Word, WordTranslation
 from src.words.schemas import (
+    WORD_LIST_ADAPTER,
+    WORD_TRANSLATION_LIST_ADAPTER,
+    LanguageCode,
     WordCreate,
     WordResponse,
     WordTranslationCreate,
     WordTranslationResponse,
+    WordLocalized,
     WordWithTranslations,
 )
 
 router = APIRouter(prefix="/words", tags=["Words"])
 
 
+def _json_response(payload, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Wrap JSON serialized by a schema or adapter, so FastAPI doesn't validate
+    and encode the response again (response_model stays for the docs).
+    """
+    return Response(content=payload, status_code=status_code, media_type="application/json")
+
+
+def _word_cache_key(word_id: int) -> str:
+    """Cache key of a word with its translations (bump v1 when the schema changes)."""
+    return f"word:v1:{word_id}"
+
+
+def _translations_cache_key(word_id: int) -> str:
+    """Cache key of a word's translation list (bump v1 when the schema changes)."""
+    return f"word_trans:v1:{word_id}"
+
+
+async def _word_insert_error(db: AsyncSession, category_id: int) -> HTTPException:
+    """Map a failed word insert to 404 (unknown category) or 409 (duplicate key)."""
+    result = await db.execute(select(Category.id).where(Category.id == category_id))
+    if result.scalar_one_or_none() is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Category with id {category_id} not found"
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A word with that key already exists"
+    )
+
+
+async def _translation_insert_error(db: AsyncSession, word_id: int) -> HTTPException:
+    """Map a failed translation insert to 404 (unknown word) or 409 (duplicate language)."""
+    result = await db.execute(select(Word.id).where(Word.id == word_id))
+    if result.scalar_one_or_none() is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Word with id {word_id} not found"
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Word with id {word_id} already has a translation in that language"
+    )
+
+
+async def invalidate_word_cache(*word_ids: int):
+    """Drop words' cached responses after they or their translations changed."""
+    if not word_ids:
+        return
+    await cache_delete(*(
+        key
+        for word_id in word_ids
+        for key in (_word_cache_key(word_id), _translations_cache_key(word_id))
+    ))
+
+
 @router.post("/", response_model=WordResponse, status_code=status.HTTP_201_CREATED)
 async def create_word(
     word: WordCreate,
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new word."""
-    db_word = Word(key=word.key, category_id=word.category_id)
-    db.add(db_word)
-    await db.commit()
-    await db.refresh(db_word)
-    return db_word
+    # The category_id foreign key guarantees the category exists, so only
+    # look it up if the insert fails
+    try:
+        result = await db.execute(
+            insert(Word)
+            .values(key=word.key, category_id=word.category_id)
+            .returning(Word)
+        )
+        db_word = result.scalar_one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise await _word_insert_error(db, word.category_id)
+    return _json_response(
+        WordResponse.model_validate(db_word).model_dump_json(),
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 @router.get("/", response_model=List[WordResponse])
 async def list_words(
-    skip: int = 0,
+    after_id: int | None = None,
     limit: int = 100,
     category_id: int | None = None,
+    skip: int = Query(0, deprecated=True, description="Use after_id instead"),
     db: AsyncSession = Depends(get_db)
 ):
-    """List all words, optionally filtered by category."""
-    query = select(Word)
+    """
+    List words ordered by ID, optionally filtered by category.
+    Paginate with after_id: pass the X-Next-After-Id header of the previous
+    page (it's only set when the page is full).
+    """
+    # Only the columns WordResponse exposes, as plain rows (no ORM entities)
+    query = select(Word.id, Word.key, Word.category_id).order_by(Word.id).limit(limit)
     
     if category_id:
         query = query.where(Word.category_id == category_id)
     
-    query = query.offset(skip).limit(limit)
+    # Seek past the previous page on the primary key instead of scanning
+    # and discarding `skip` rows
+    if after_id is not None:
+        query = query.where(Word.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+    
     result = await db.execute(query)
-    words = result.scalars().all()
-    return words
+    words = result.all()
+    
+    payload = WORD_LIST_ADAPTER.dump_json(WORD_LIST_ADAPTER.validate_python(words, from_attributes=True))
+    response = _json_response(payload)
+    if words and len(words) == limit:
+        response.headers["X-Next-After-Id"] = str(words[-1].id)
+    return response
 
 
 @router.get("/{word_id}", response_model=WordWithTranslations)
@@ -55,10 +149,21 @@ async def get_word(
     db: AsyncSession = Depends(get_db)
 ):
     """Get a word by ID with all its translations."""
+    cache_key = _word_cache_key(word_id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return _json_response(cached)
+    
+    # Load translations up front (lazy loading doesn't work with async
+    # sessions) in the same query via a LEFT JOIN, which is cheaper than a
+    # second SELECT for a single word, and fail loudly if anything else
+    # gets lazy-loaded
     result = await db.execute(
-        select(Word).where(Word.id == word_id)
+        select(Word)
+        .options(joinedload(Word.translations), raiseload("*"))
+        .where(Word.id == word_id)
     )
-    word = result.scalar_one_or_none()
+    word = result.unique().scalar_one_or_none()
     
     if not word:
         raise HTTPException(
@@ -66,7 +171,33 @@ async def get_word(
             detail=f"Word with id {word_id} not found"
         )
     
-    return word
+    payload = WordWithTranslations.model_validate(word).model_dump_json()
+    await cache_set(cache_key, payload)
+    return _json_response(payload)
+
+
+@router.get("/{word_id}/localized", response_model=WordLocalized)
+async def get_word_localized(
+    word_id: int,
+    language: LanguageCode = "es",
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a word with its value in one language."""
+    # One query for just the columns WordLocalized needs
+    result = await db.execute(
+        select(Word.id, Word.key, Word.category_id, WordTranslation.value)
+        .join(WordTranslation, WordTranslation.word_id == Word.id)
+        .where(Word.id == word_id, WordTranslation.language == language)
+    )
+    row = result.one_or_none()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Word with id {word_id} has no '{language}' translation"
+        )
+    
+    return _json_response(WordLocalized(**row._mapping).model_dump_json())
 
 
 @router.delete("/{word_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -74,20 +205,23 @@ async def delete_word(
     word_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    """Delete a word."""
+    """Delete a word and its translations."""
+    # Delete the translations explicitly in the same transaction, rather than
+    # relying on ON DELETE CASCADE, which create_all doesn't add to existing
+    # tables
+    await db.execute(delete(WordTranslation).where(WordTranslation.word_id == word_id))
     result = await db.execute(
-        select(Word).where(Word.id == word_id)
+        delete(Word).where(Word.id == word_id).returning(Word.id)
     )
-    word = result.scalar_one_or_none()
     
-    if not word:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Word with id {word_id} not found"
         )
     
-    await db.delete(word)
     await db.commit()
+    await invalidate_word_cache(word_id)
 
 
 # ========== Word Translations Endpoints ==========
@@ -104,27 +238,64 @@ async def create_word_translation(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a translation for a word."""
-    # Verify word exists
-    result = await db.execute(
-        select(Word).where(Word.id == word_id)
+    # The word_id foreign key already guarantees the word exists, so insert
+    # directly and only look the word up if the insert fails
+    try:
+        result = await db.execute(
+            insert(WordTranslation)
+            .values(word_id=word_id, language=translation.language, value=translation.value)
+            .returning(WordTranslation)
+        )
+        db_translation = result.scalar_one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise await _translation_insert_error(db, word_id)
+    
+    await invalidate_word_cache(word_id)
+    return _json_response(
+        WordTranslationResponse.model_validate(db_translation).model_dump_json(),
+        status_code=status.HTTP_201_CREATED
     )
-    word = result.scalar_one_or_none()
+
+
+@router.post(
+    "/{word_id}/translations:batch",
+    response_model=List[WordTranslationResponse],
+    status_code=status.HTTP_201_CREATED
+)
+async def create_word_translations_batch(
+    word_id: int,
+    translations: List[WordTranslationCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """Create several translations for a word in one request."""
+    if not translations:
+        return _json_response(b"[]", status_code=status.HTTP_201_CREATED)
     
-    if not word:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Word with id {word_id} not found"
+    # One executemany-style INSERT ... RETURNING; SQLAlchemy splits large
+    # batches into multi-row statements on its own
+    try:
+        result = await db.scalars(
+            insert(WordTranslation).returning(WordTranslation, sort_by_parameter_order=True),
+            [
+                {"word_id": word_id, "language": t.language, "value": t.value}
+                for t in translations
+            ]
         )
+        db_translations = result.all()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise await _translation_insert_error(db, word_id)
     
-    db_translation = WordTranslation(
-        word_id=word_id,
-        language=translation.language,
-        value=translation.value
+    await invalidate_word_cache(word_id)
+    return _json_response(
+        WORD_TRANSLATION_LIST_ADAPTER.dump_json(
+            WORD_TRANSLATION_LIST_ADAPTER.validate_python(db_translations, from_attributes=True)
+        ),
+        status_code=status.HTTP_201_CREATED
     )
-    db.add(db_translation)
-    await db.commit()
-    await db.refresh(db_translation)
-    return db_translation
 
 
 @router.get(
@@ -136,8 +307,18 @@ async def list_word_translations(
     db: AsyncSession = Depends(get_db)
 ):
     """List all translations for a word."""
+    cache_key = _translations_cache_key(word_id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return _json_response(cached)
+    
     result = await db.execute(
         select(WordTranslation).where(WordTranslation.word_id == word_id)
     )
     translations = result.scalars().all()
-    return translations
+    
+    payload = WORD_TRANSLATION_LIST_ADAPTER.dump_json(
+        WORD_TRANSLATION_LIST_ADAPTER.validate_python(translations, from_attributes=True)
+    )
+    await cache_set(cache_key, payload)
+    return _json_response(payload)
@@ -1,6 +1,6 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Literal
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 
 if TYPE_CHECKING:
     from src.categories.schemas import CategoryResponse
@@ -34,9 +34,13 @@ class WordResponse(WordBase):
 
 # ========== WordTranslation Schemas ==========
 
+# Languages the game supports; stored as two-letter codes
+LanguageCode = Literal["es", "en", "fr", "de", "it", "pt"]
+
+
 class WordTranslationBase(BaseModel):
     """Base schema for WordTranslation."""
-    language: str = Field(..., min_length=2, max_length=5, description="Language code (e.g. 'es', 'en')")
+    language: LanguageCode = Field(..., description="Language code (e.g. 'es', 'en')")
     value: str = Field(..., min_length=1, max_length=200, description="Translated word value")
 
 
@@ -47,7 +51,7 @@ class WordTranslationCreate(WordTranslationBase):
 
 class WordTranslationUpdate(BaseModel):
     """Schema for updating a WordTranslation."""
-    language: str | None = Field(None, min_length=2, max_length=5, description="Language code")
+    language: LanguageCode | None = Field(None, description="Language code")
     value: str | None = Field(None, min_length=1, max_length=200, description="Translated word value")
 
 
@@ -83,3 +87,11 @@ class WordWithCategory(WordResponse):
     category: "CategoryResponse"
     
     model_config = ConfigDict(from_attributes=True)
+
+
+# ========== List adapters ==========
+# Built once at import so whole lists of ORM rows are validated and
+# serialized in a single pydantic-core call
+
+WORD_LIST_ADAPTER = TypeAdapter(List[WordResponse])
+WORD_TRANSLATION_LIST_ADAPTER = TypeAdapter(List[WordTranslationResponse])
@@ -0,0 +1,76 @@
+"""Shared fixtures: a seeded in-memory database that counts SQL statements, and a fake Redis."""
+import os
+
+# Keep src.database off the development database file
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.categories.models import Category
+from src.database import Base, _enable_sqlite_foreign_keys
+from src.redis.client import redis_client
+from src.words.models import Word, WordTranslation
+
+
+@pytest.fixture
+async def engine():
+    """In-memory SQLite engine with the schema created and foreign keys on."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    event.listen(engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(engine):
+    """Session on a database seeded with one category, two words and their translations."""
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        session.add(Category(id=1, key="animals"))
+        session.add_all([
+            Word(id=1, key="dog", category_id=1),
+            Word(id=2, key="cat", category_id=1),
+        ])
+        await session.flush()
+        session.add_all([
+            WordTranslation(word_id=1, language="es", value="perro"),
+            WordTranslation(word_id=1, language="en", value="dog"),
+            WordTranslation(word_id=2, language="es", value="gato"),
+        ])
+        await session.commit()
+        yield session
+
+
+@pytest.fixture
+def statements(engine):
+    """
+    SQL statements sent to the database, recorded as they execute.
+    Clear it right before the code under test to count only its queries.
+    """
+    recorded = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+    
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+async def redis():
+    """Fake Redis (with Lua scripting) installed as the app's Redis client."""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redis_client._redis = client
+    yield client
+    redis_client._redis = None
+    await client.aclose()
@@ -0,0 +1,220 @@
+"""RoomManager's Lua-scripted updates, run on fake Redis."""
+import pytest
+
+from src.rooms.models import Player, RoomPhase, RoomSettings
+from src.rooms.redis_manager import RoomManager
+
+
+async def make_room(settings=None, players=2):
+    """Create a room with a ready host (h1) and players p2..pN."""
+    room = await RoomManager.create_room(
+        settings or RoomSettings(),
+        Player(id="h1", username="host", is_host=True, is_ready=True)
+    )
+    for n in range(2, players + 1):
+        await RoomManager.join_room(room.id, Player(id=f"p{n}", username=f"player{n}"), None)
+    return room
+
+
+# ========== JOIN_ROOM ==========
+
+async def test_join_adds_player(redis):
+    room = await make_room(players=1)
+    
+    result = await RoomManager.join_room(room.id, Player(id="p2", username="bob"), None)
+    
+    assert result.status == "joined"
+    assert result.player_id == "p2"
+    assert set(result.room.players) == {"h1", "p2"}
+    assert result.room.version == room.version + 1
+    assert await RoomManager.find_player_id_by_username(room.id, "bob") == "p2"
+    assert await redis.zscore(RoomManager.PUBLIC_ROOMS_SET, room.id) == 2
+
+
+async def test_join_with_known_username_reconnects(redis):
+    room = await make_room(players=1)
+    
+    result = await RoomManager.join_room(room.id, Player(id="other", username="host"), None)
+    
+    assert result.status == "reconnected"
+    assert result.player_id == "h1"
+    assert set(result.room.players) == {"h1"}
+
+
+async def test_join_checks_password(redis):
+    room = await make_room(RoomSettings(password="secret"), players=1)
+    
+    bad = await RoomManager.join_room(room.id, Player(id="p2", username="bob"), "wrong")
+    good = await RoomManager.join_room(room.id, Player(id="p2", username="bob"), "secret")
+    
+    assert bad.status == "bad_password"
+    assert good.status == "joined"
+
+
+async def test_join_full_room(redis):
+    room = await make_room(RoomSettings(max_players=3), players=3)
+    
+    result = await RoomManager.join_room(room.id, Player(id="p4", username="late"), None)
+    
+    assert result.status == "full"
+    assert len((await RoomManager.get_room(room.id)).players) == 3
+
+
+async def test_join_unknown_room(redis):
+    assert await RoomManager.join_room("missing", Player(id="p2", username="bob"), None) is None
+
+
+async def test_join_never_overwrites_a_player_with_the_same_id(redis):
+    room = await make_room(players=2)
+    
+    result = await RoomManager.join_room(room.id, Player(id="p2", username="bob"), None)
+    
+    assert result.status == "joined"
+    assert result.player_id != "p2"
+    assert result.room.players["p2"].username == "player2"
+    assert result.room.players[result.player_id].username == "bob"
+
+
+# ========== REMOVE_PLAYER ==========
+
+async def test_remove_player_keeps_room(redis):
+    room = await make_room(players=3)
+    await RoomManager.toggle_player_ready(room.id, "p2")
+    
+    host_id, count_before, room_after = await RoomManager.remove_player_with_meta(room.id, "p2")
+    
+    assert (host_id, count_before) == ("h1", 3)
+    assert set(room_after.players) == {"h1", "p3"}
+    assert (await RoomManager.get_counts(room.id)).ready_count == 1
+    assert await RoomManager.find_player_id_by_username(room.id, "player2") is None
+    assert await redis.zscore(RoomManager.PUBLIC_ROOMS_SET, room.id) == 2
+
+
+async def test_remove_host_deletes_room(redis):
+    room = await make_room(players=3)
+    
+    host_id, count_before, room_after = await RoomManager.remove_player_with_meta(room.id, "h1")
+    
+    assert (host_id, count_before, room_after) == ("h1", 3, None)
+    assert await RoomManager.get_room(room.id) is None
+    assert await redis.zscore(RoomManager.PUBLIC_ROOMS_SET, room.id) is None
+
+
+async def test_remove_unknown_player(redis):
+    room = await make_room()
+    assert await RoomManager.remove_player_with_meta(room.id, "nobody") is None
+
+
+# ========== TOGGLE_READY ==========
+
+async def test_toggle_ready_updates_count_and_version(redis):
+    room = await make_room()
+    
+    ready = await RoomManager.toggle_player_ready(room.id, "p2")
+    not_ready = await RoomManager.toggle_player_ready(room.id, "p2")
+    
+    assert ready.players["p2"].is_ready
+    assert not not_ready.players["p2"].is_ready
+    assert not_ready.version == ready.version + 1
+    assert (await RoomManager.get_counts(room.id)).ready_count == 1
+
+
+# ========== REQUEST_VOTE / SUBMIT_VOTE ==========
+
+async def start_playing(room_id):
+    room = await RoomManager.get_room(room_id)
+    room.phase = RoomPhase.PLAYING
+    await RoomManager.update_room(room)
+
+
+async def test_request_vote_outside_playing_phase(redis):
+    room = await make_room()
+    
+    status, room_after = await RoomManager.request_vote(room.id, "h1", 0.0)
+    
+    assert status == 0
+    assert not room_after.players["h1"].wants_to_vote
+
+
+async def test_request_vote_starts_voting_on_majority(redis):
+    room = await make_room(players=3)
+    await start_playing(room.id)
+    
+    first, _ = await RoomManager.request_vote(room.id, "h1", 1.0)
+    second, room_after = await RoomManager.request_vote(room.id, "p2", 2.0)
+    
+    assert (first, second) == (1, 2)
+    assert room_after.phase == RoomPhase.VOTING
+
+
+async def test_submit_vote(redis):
+    room = await make_room(players=3)
+    await start_playing(room.id)
+    await RoomManager.request_vote(room.id, "h1", 1.0)
+    await RoomManager.request_vote(room.id, "p2", 2.0)
+    
+    recorded, room_after = await RoomManager.submit_vote(room.id, "h1", "p2")
+    
+    assert recorded
+    assert room_after.players["h1"].vote == "p2"
+
+
+@pytest.mark.parametrize("voted_for_id", ["h1", "nobody"])
+async def test_submit_invalid_vote(redis, voted_for_id):
+    room = await make_room(players=3)
+    await start_playing(room.id)
+    await RoomManager.request_vote(room.id, "h1", 1.0)
+    await RoomManager.request_vote(room.id, "p2", 2.0)
+    
+    recorded, room_after = await RoomManager.submit_vote(room.id, "h1", voted_for_id)
+    
+    assert not recorded
+    assert room_after.players["h1"].vote is None
+
+
+# ========== Versions ==========
+
+async def test_saving_a_stale_room_still_bumps_the_version(redis):
+    room = await make_room()
+    stale = await RoomManager.get_room(room.id)
+    
+    toggled = await RoomManager.toggle_player_ready(room.id, "p2")
+    await RoomManager.update_room(stale)
+    
+    assert stale.version == toggled.version + 1
+    assert (await RoomManager.get_room(room.id)).version == stale.version
+
+
+async def test_rename_player_moves_username_index(redis):
+    room = await make_room()
+    
+    room_after = await RoomManager.update_player_username(room.id, "p2", "bobby")
+    
+    assert room_after.players["p2"].username == "bobby"
+    assert await RoomManager.find_player_id_by_username(room.id, "bobby") == "p2"
+    assert await RoomManager.find_player_id_by_username(room.id, "player2") is None
+
+
+# ========== Rooms saved before ready_count ==========
+
+async def test_counts_without_ready_count_field(redis):
+    room = await make_room(players=3)
+    await RoomManager.toggle_player_ready(room.id, "p2")
+    await redis.hdel(f"{RoomManager.ROOM_PREFIX}{room.id}", "ready_count")
+    
+    assert (await RoomManager.get_counts(room.id)).ready_count == 2
+    
+    await RoomManager.toggle_player_ready(room.id, "p3")
+    assert (await RoomManager.get_counts(room.id)).ready_count == 3
+    
+    await RoomManager.remove_player_with_meta(room.id, "p3")
+    assert (await RoomManager.get_counts(room.id)).ready_count == 2
+
+
+async def test_remove_player_without_ready_count_field(redis):
+    room = await make_room(players=3)
+    await redis.hdel(f"{RoomManager.ROOM_PREFIX}{room.id}", "ready_count")
+    
+    await RoomManager.remove_player_with_meta(room.id, "p2")
+    
+    assert await redis.hget(f"{RoomManager.ROOM_PREFIX}{room.id}", "ready_count") == "1"
@@ -0,0 +1,89 @@
+"""Word endpoints: statement counts and cache behaviour."""
+import orjson
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, text
+
+from src.categories import router as categories_router
+from src.words import router
+from src.words.models import Word, WordTranslation
+from src.words.schemas import WordCreate
+
+
+async def test_get_word_runs_one_statement(db, redis, statements):
+    statements.clear()
+    response = await router.get_word(1, db)
+    
+    assert len(statements) == 1
+    word = orjson.loads(response.body)
+    assert word["key"] == "dog"
+    assert {t["language"] for t in word["translations"]} == {"es", "en"}
+
+
+async def test_get_word_is_served_from_cache(db, redis, statements):
+    first = await router.get_word(1, db)
+    
+    statements.clear()
+    second = await router.get_word(1, db)
+    
+    assert statements == []
+    assert second.body == first.body
+
+
+async def test_list_words_runs_one_statement(db, statements):
+    statements.clear()
+    response = await router.list_words(after_id=None, limit=1, category_id=None, skip=0, db=db)
+    
+    assert len(statements) == 1
+    assert [w["key"] for w in orjson.loads(response.body)] == ["dog"]
+    assert response.headers["X-Next-After-Id"] == "1"
+
+
+@pytest.mark.parametrize("word, status_code", [
+    (WordCreate(key="bird", category_id=99), 404),
+    (WordCreate(key="dog", category_id=1), 409),
+])
+async def test_create_word_integrity_errors(db, word, status_code):
+    with pytest.raises(HTTPException) as exc_info:
+        await router.create_word(word, db)
+    
+    assert exc_info.value.status_code == status_code
+
+
+async def test_create_word(db):
+    response = await router.create_word(WordCreate(key="bird", category_id=1), db)
+    
+    assert response.status_code == 201
+    assert orjson.loads(response.body)["key"] == "bird"
+
+
+async def drop_translation_cascade(db):
+    """Recreate word_translation the way older schemas had it: no ON DELETE CASCADE."""
+    await db.execute(text("CREATE TABLE old_translation AS SELECT * FROM word_translation"))
+    await db.execute(text("DROP TABLE word_translation"))
+    await db.execute(text(
+        "CREATE TABLE word_translation ("
+        "id INTEGER PRIMARY KEY, word_id INTEGER NOT NULL REFERENCES word(id), "
+        "language VARCHAR(5) NOT NULL, value VARCHAR(200) NOT NULL)"
+    ))
+    await db.execute(text("INSERT INTO word_translation SELECT * FROM old_translation"))
+    await db.execute(text("DROP TABLE old_translation"))
+    await db.commit()
+
+
+async def test_delete_word_without_db_cascade(db, redis):
+    await drop_translation_cascade(db)
+    
+    await router.delete_word(1, db)
+    
+    remaining = await db.execute(select(WordTranslation.word_id))
+    assert remaining.scalars().all() == [2]
+
+
+async def test_delete_category_without_db_cascade(db, redis):
+    await drop_translation_cascade(db)
+    
+    await categories_router.delete_category(1, db)
+    
+    assert (await db.execute(select(Word.id))).scalars().all() == []
+    assert (await db.execute(select(WordTranslation.id))).scalars().all() == []